@@ -1,18 +1,22 @@
 #!/usr/bin/env python3
 
 import os
-import sys
+import re
 import time
 import yaml
+import pickle
 import socket
+import hashlib
 import argparse
 
-# Check Python version, need at least 3.6
-valid_python = sys.version_info.major >= 3 and sys.version_info.minor >= 6 
-assert valid_python, "You need Python version >=3.6 to run this script!"
+from util import PORT, _read_exactly, _read_until_prompt, write_command_and_read_output
 
-# The port for the telnet service on the IPMC
-PORT = 23
+# Use the libyaml-backed loader when PyYAML was built with it, it is much
+# faster than the pure-Python one
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 # A mapping of Service Module serial numbers to the IPMC IP addresses
 SM_TO_IPMC = {
@@ -43,87 +47,105 @@ CONFIG_TO_COMMANDS = {
     },
 }
 
+# The same mapping flattened into (key, subkey, command) triplets once at
+# import time, so the hot loops below avoid the nested dict iteration
+_FLAT_COMMANDS = tuple(
+    (key, subkey, commandbase)
+    for key, item in CONFIG_TO_COMMANDS.items()
+    for subkey, commandbase in item.items()
+)
+
+# Pre-compiled pattern for the "key = value" lines in the eepromrd output
+_EEPROM_FIELD_RE = re.compile(r'^\s*([^=\n]+?)\s*=\s*(.*?)\s*$', re.M)
+
+# Commands that actually write to the EEPROM; only these get the optional
+# settle time from --settle-ms
+_EEPROM_WRITE_COMMANDS = ('idwr', 'revwr', 'verwr', 'bootmode', 'ethmacwr')
+
 def parse_cli():
     parser = argparse.ArgumentParser()
     parser.add_argument('board_number', type=int, help='The serial number of the Apollo SM.')
     parser.add_argument('-c', '--config-path', default='config/ipmc_config.yaml', help='Path to the IPMC config file.')
+    parser.add_argument('--settle-ms', type=int, default=0, help='Settle time (ms) after each EEPROM-writing command. 0 pipelines all commands in one burst.')
     args = parser.parse_args()
     return args
 
 
+def _load_cached_yaml(filepath: str):
+    """
+    Parses the given YAML file, caching the result in a pickle sidecar.
+
+    The cache key is derived from the absolute path, mtime and size of the
+    YAML file, so a stale pickle is never served after the configuration is
+    edited and different config files never share an entry. Loading the
+    pickle is much cheaper than re-parsing the YAML on every invocation.
+
+    The sidecar lives under the user's own cache directory: pickles must
+    never be loaded from a location other users can write to.
+    """
+    key = f"{os.path.abspath(filepath)}-{os.path.getmtime(filepath)}-{os.path.getsize(filepath)}"
+    cache_dir = os.path.expanduser('~/.cache/ipmc_scripts')
+    cache_path = os.path.join(cache_dir, f"{hashlib.sha256(key.encode()).hexdigest()}.pkl")
+
+    # Serve the cached parse if there is one for this exact file state
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    with open(filepath, 'r') as f:
+        data = yaml.load(f, Loader=YamlLoader)
+
+    # Cache the parsed configuration for the next run
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(data, f)
+    except OSError:
+        pass
+
+    return data
+
+
 def read_config(filepath: str):
     """Reads the YAML configuration file from the given file path."""
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Could not find IPMC configuration file: {filepath}")
-    
-    with open(filepath, 'r') as f:
-        data = yaml.safe_load(f)
-    
+    # No exists() pre-check: just try to read the file and translate the
+    # error. This saves a stat() and avoids the check-then-open race.
+    try:
+        data = _load_cached_yaml(filepath)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Could not find IPMC configuration file: {filepath}") from None
+
+    # MAC addresses are the one special case in the config: the IPMC wants
+    # the octets space-separated. Reformat them once here (a no-op if they
+    # are already in that form), so the command generation downstream can
+    # treat every value uniformly.
+    if 'mac' in data:
+        for subkey, value in data['mac'].items():
+            data['mac'][subkey] = ' '.join(str(value).split(':'))
+
     return data
 
 
 def validate_config(config):
     """Make sure that all the required keys are in place for the configuration."""
-    for key, item in CONFIG_TO_COMMANDS.items():
+    for key, subkey, _ in _FLAT_COMMANDS:
         assert key in config, f"Key cannot be found: {key}"
-
-        for subkey in item.keys():
-            assert subkey in config[key], f"Sub-key cannot be found: {subkey} (under {key})"
+        assert subkey in config[key], f"Sub-key cannot be found: {subkey} (under {key})"
 
 
 def get_commands(config):
     """
     Given the configuration of IPMC fields, generate the set of commands necessary to set them in EEPROM.
     """
-    commands = []
-
-    for key, item in CONFIG_TO_COMMANDS.items():
-        for subkey, commandbase in item.items():
-            # Read the value from the config and figure out the command
-            # Some minor pre-processing for MAC address values 
-            value = str(config[key][subkey]).replace(':', ' ')
-            commands.append(f"{commandbase} {value}\r\n")
-
-    return commands
-
-
-def write_command_and_read_output(
-    sock: socket.socket, 
-    command: str,
-    max_size: int=2048,
-    read_until: bytes=b">",
-    ) -> str:
-    """
-    Given the socket interface, writes a command to IPMC TelNet interface 
-    and returns the data echoed back.
-
-    The maximum message size to expect is specified via the max_size argument.
-    """
-    counter = 0
-    data = b""
-
-    # Send the command one byte at a time
-    for ch in command:
-        sock.send(bytes(ch, 'utf-8'))
-        # Read back the command
-        _ = sock.recv(1)
-
-    # Recieve the echoed message one byte at a time
-    while counter < max_size:
-        rcv = sock.recv(1)
-        if rcv == read_until:
-            if counter != 0:
-                break
-            else:
-                continue
-        data += rcv
-        counter += 1
-
-    # Get the leftover ">" and " " characters before exiting
-    for i in range(2):
-        _ = sock.recv(1)
-
-    return data.decode('ascii')
+    # MAC addresses were already reformatted at config-load time, so every
+    # value can be used as-is here
+    return [
+        f"{commandbase} {config[key][subkey]}\r\n"
+        for key, subkey, commandbase in _FLAT_COMMANDS
+    ]
 
 
 def validate_command_output(output, config):
@@ -135,22 +157,20 @@ def validate_command_output(output, config):
         "prom version" : f'0x{config["eeprom"]["version"]:02X}',
         "bootmode"     : f'0x{config["zynq"]["bootmode"]:02X}',
         "hw"           : f'rev{config["board"]["rev"]} #{config["board"]["serial"]}',
-        "eth0_mac"     : config["mac"]["eth0"],
-        "eth1_mac"     : config["mac"]["eth1"],
+        # The config holds MACs space-separated (see read_config), while
+        # eepromrd prints them with colons
+        "eth0_mac"     : config["mac"]["eth0"].replace(' ', ':'),
+        "eth1_mac"     : config["mac"]["eth1"].replace(' ', ':'),
     }
 
     print(">> Examining EEPROM output")
 
-    # Extract the value mapping from the eepromrd output
-    tokens = output.split('\n')
-    mapping = {}
-
-    for token in tokens:
-        if '=' not in token:
-            continue
-        split_items = token.split('=')
-        if split_items[0].strip() in expected:
-            mapping[split_items[0].strip()] = split_items[-1].strip()
+    # Extract the value mapping from the eepromrd output in a single scan
+    mapping = {
+        match.group(1): match.group(2)
+        for match in _EEPROM_FIELD_RE.finditer(output)
+        if match.group(1) in expected
+    }
 
     # Compare the expected and recieved outputs
     for key in expected.keys():
@@ -191,24 +211,57 @@ def main():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         # Make the connection
         s.connect((HOST, PORT))
+        # Disable Nagle's algorithm so that the small telnet packets go out
+        # immediately instead of queuing behind the Nagle timer
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Make the receive buffer large enough to hold a full eepromrd
+        # response so the kernel never stalls the sender mid-reply. Values
+        # above the kernel maximum (net.core.rmem_max) are silently clamped.
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+        # Keepalive probes catch a silently-dead IPMC between commands
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
         s.settimeout(timeout)
         
         print(f'\n> Connection established to: {HOST}:{PORT}')
         print(f'> Timeout set to: {timeout} s')
         print(f'> Executing update commands...\n')
 
-        # Execute the commands and read back data
-        for command in commands:
-            print(f'>> {command}', end='   ')
-            try:
-                output = write_command_and_read_output(s, command)
-                print('-> OK')
-            except socket.timeout:
-                print('-> Command timed out, skipping.')
-                continue
-            
-            time.sleep(0.5)
-        
+        if args.settle_ms > 0:
+            # Conservative path: run the commands one at a time and give
+            # the EEPROM-writing ones time to settle before the next
+            for command in commands:
+                print(f'>> {command}', end='   ')
+                try:
+                    output = write_command_and_read_output(s, command)
+                    print('-> OK')
+                except socket.timeout:
+                    print('-> Command timed out, skipping.')
+                    continue
+
+                if command.startswith(_EEPROM_WRITE_COMMANDS):
+                    time.sleep(args.settle_ms / 1000.0)
+        else:
+            # Pipeline the commands: send them all in a single burst, then
+            # read the prompt-terminated responses back in order. The total
+            # latency is one round trip plus processing time, instead of
+            # one round trip per command.
+            s.sendall(b"".join(command.encode('ascii') for command in commands))
+
+            buf = bytearray()
+            for command in commands:
+                print(f'>> {command}', end='   ')
+                try:
+                    # Skip the echo of the command, then read up to the prompt
+                    _read_exactly(s, buf, len(command))
+                    output = _read_until_prompt(s, buf)
+                    print('-> OK')
+                except socket.timeout:
+                    print('-> Command timed out, skipping.')
+                    # The stream position is unknown after a timeout, drop
+                    # any partial response before reading the next one
+                    buf.clear()
+                    continue
+
         # Do a final read of the EEPROM before exiting
         print('\nCommands are done. EEPROM reads as:')
         out = write_command_and_read_output(s, "eepromrd\r\n")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import socket
+import asyncio
+import argparse
+
+from util import PORT, write_command_and_read_output
+
+# Timeout value (s) for socket connections
+TIMEOUT = 5
+
+
+def parse_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('ipmc_ip_addr', nargs='+', help='IP address(es) of the IPMCs to poll.')
+    args = parser.parse_args()
+    return args
+
+
+def poll_ipmc(host: str) -> str:
+    """Polls a single IPMC over its telnet interface and returns the EEPROM contents."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.connect((host, PORT))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.settimeout(TIMEOUT)
+
+        return write_command_and_read_output(s, "eepromrd\r\n")
+
+
+async def poll_ipmc_async(host: str) -> str:
+    """Asynchronous version of poll_ipmc, used when polling several IPMCs at once."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, PORT), TIMEOUT)
+
+    # Disable Nagle's algorithm on the underlying socket, as in the sync path
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    command = b"eepromrd\r\n"
+    writer.write(command)
+    await writer.drain()
+
+    # Read the echo of the command plus the response, up to the prompt
+    data = await asyncio.wait_for(reader.readuntil(b"> "), TIMEOUT)
+
+    writer.close()
+
+    return data[len(command):-2].decode('ascii')
+
+
+async def _poll_all(hosts):
+    """Polls all the given IPMCs concurrently and returns the outputs in order."""
+    return await asyncio.gather(
+        *[poll_ipmc_async(host) for host in hosts],
+        return_exceptions=True,
+    )
+
+
+def main():
+    args = parse_cli()
+    hosts = args.ipmc_ip_addr
+
+    # A single IPMC is polled over a plain blocking socket; for several,
+    # poll them all concurrently so the total time is that of the slowest
+    # IPMC rather than the sum of all of them
+    if len(hosts) == 1:
+        outputs = [poll_ipmc(hosts[0])]
+    else:
+        outputs = asyncio.run(_poll_all(hosts))
+
+    for host, output in zip(hosts, outputs):
+        print(f'\n> EEPROM contents for IPMC: {host}')
+        if isinstance(output, Exception):
+            print(f'Failed to poll IPMC: {output}')
+            continue
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
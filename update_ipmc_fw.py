@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sys
 import time
 import socket
 import argparse
 import subprocess
 
-
-# Check Python version, need at least 3.6
-valid_python = sys.version_info.major >= 3 and sys.version_info.minor >= 6 
-assert valid_python, "You need Python version >=3.6 to run this script!"
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 # IPMC information we want to check before any firmware upgrade
@@ -18,6 +16,13 @@ IPMC_INFO = {
     "FRU Device Description" : "Builtin FRU Device (ID 0)",
 }
 
+# Pre-compiled pattern matching only the fru output fields we care about,
+# so the whole output can be checked in a single scan
+_FRU_RE = re.compile(
+    r'^(' + '|'.join(re.escape(key) for key in IPMC_INFO) + r')\s*:\s*(.+)$',
+    re.M,
+)
+
 
 def parse_cli():
     """
@@ -57,13 +62,12 @@ def get_ipmc_info(shelf_address: str, ipmb_address: str) -> str:
     Returns:
         Optional[str]: The output of the fru command.
     """
-    command = f'ipmitool -H {shelf_address} -P "" -t {ipmb_address} fru'
+    command = ['ipmitool', '-H', shelf_address, '-P', '', '-t', ipmb_address, 'fru']
 
     # Run the ipmitool fru command to retrieve information
-    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-    stdout, _ = proc.communicate()
+    proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    return stdout.decode('latin-1')
+    return proc.stdout.decode('latin-1')
 
 
 def validate_ipmc_info(shelf_address: str, ipmb_address: str) -> bool:
@@ -84,18 +88,10 @@ def validate_ipmc_info(shelf_address: str, ipmb_address: str) -> bool:
         print(f'Error message: {e.output}')
         return False    
 
-    rows = input.split('\n')
-
-    # Go through the information list and check
-    for row in rows:
-        temp = row.split(':')
-        if len(temp) < 2:
-            continue
-        field_name = temp[0].strip()
-        field_value = temp[1].strip()
-
-        if field_name not in IPMC_INFO:
-            continue
+    # Check the fields we are interested in with a single regex pass
+    for match in _FRU_RE.finditer(input):
+        field_name = match.group(1)
+        field_value = match.group(2).strip()
 
         # Check if this information matches the one we're expecting
         if field_value != IPMC_INFO[field_name]:
@@ -119,14 +115,17 @@ def update_ipmc_firmware(shelf_address: str, ipmb_address: str, upgrade_file: st
     Returns:
         bool: Specifies success or failure for the update operation.
     """
-    command = f'ipmitool -H {shelf_address} -P "" -t {ipmb_address} hpm upgrade {upgrade_file}'
+    command = ['ipmitool', '-H', shelf_address, '-P', '', '-t', ipmb_address, 'hpm', 'upgrade', upgrade_file]
     try:
-        subprocess.run(command, shell=True, stdout=sys.stdout, stderr=sys.stderr)
-    except subprocess.SubprocessError as e: 
+        res = subprocess.run(command, capture_output=True, text=True)
+        # Print the captured output in one block, prefixed with the slot,
+        # so concurrent slot updates do not interleave their logs
+        sys.stdout.write(f'[{ipmb_address}] hpm upgrade:\n{res.stdout}{res.stderr}')
+    except subprocess.SubprocessError as e:
         print(f'Failed to update IPMC firmware for slot: {ipmb_address}, skipping.')
         print(f'Error message: {e.output}')
         return False
-    
+
     return True
 
 
@@ -140,41 +139,68 @@ def activate_ipmc_firmware(shelf_address: str, ipmb_address: str) -> bool:
     Returns:
         bool: Specifies success or failure for the activation operation.
     """
-    command = f'ipmitool -H {shelf_address} -P "" -t {ipmb_address} hpm activate'
+    command = ['ipmitool', '-H', shelf_address, '-P', '', '-t', ipmb_address, 'hpm', 'activate']
     try:
-        subprocess.run(command, shell=True, stdout=sys.stdout, stderr=sys.stderr)
-    except subprocess.SubprocessError as e: 
+        res = subprocess.run(command, capture_output=True, text=True)
+        # As for the upgrade, print the captured output in one block
+        sys.stdout.write(f'[{ipmb_address}] hpm activate:\n{res.stdout}{res.stderr}')
+    except subprocess.SubprocessError as e:
         print(f'Failed to activate IPMC firmware for slot: {ipmb_address}, skipping.')
         print(f'Error message: {e.output}')
         return False
-    
+
     return True
 
 
+def _process_slot(shelf_address: str, ipmb_address: str, upgrade_file: str) -> bool:
+    """Runs the full validate -> update -> activate pipeline for a single slot.
+
+    Args:
+        shelf_address (str): IP address of the shelf.
+        ipmb_address (str): IPMB address for the slot where the IPMC is located.
+        upgrade_file (str): Path to the upgrade file to be used.
+
+    Returns:
+        bool: Specifies success or failure for the whole pipeline.
+    """
+    # First, check if the information on the IPMC makes sense
+    print(f'\nValidating IPMC information for slot: {ipmb_address}...')
+    if not validate_ipmc_info(shelf_address, ipmb_address):
+        return False
+
+    # Then, move on to updating and activating the IPMC firmware for the slot
+    print(f'\nUpdating and activating the IPMC firmware for slot: {ipmb_address}')
+
+    if not update_ipmc_firmware(shelf_address, ipmb_address, upgrade_file):
+        return False
+
+    # Wait 1s between update and activate commands
+    time.sleep(1)
+
+    return activate_ipmc_firmware(shelf_address, ipmb_address)
+
+
 def main():
     args = parse_cli()
 
-    for ipmb in args.ipmb:
-        # First, check if the information on the IPMC makes sense
-        print(f'\nValidating IPMC information for slot: {ipmb}...', end=' ')
-        if not validate_ipmc_info(args.shelf, ipmb):
-            continue
-        print('OK')
-
-        # Then, move on to updating and activating the IPMC firmware for the slot
-        print('\nUpdating and activating the IPMC firmware\n')
-        print(f'Shelf         : {args.shelf}')
-        print(f'Slot          : {ipmb}')
-        print(f'Upgrade file  : {os.path.abspath(args.upgrade_file)}')
-
-        if not update_ipmc_firmware(args.shelf, ipmb, args.upgrade_file):
-            continue
-        
-        # Wait 1s between update and activate commands
-        time.sleep(1)
-
-        if not activate_ipmc_firmware(args.shelf, ipmb):
-            continue
+    print(f'Shelf         : {args.shelf}')
+    print(f'Slots         : {", ".join(args.ipmb)}')
+    print(f'Upgrade file  : {os.path.abspath(args.upgrade_file)}')
+
+    # Each slot talks to an independent IPMC and the ipmitool calls just
+    # block on the network, so run the slots in parallel
+    with ThreadPoolExecutor(max_workers=len(args.ipmb)) as executor:
+        futures = {
+            executor.submit(_process_slot, args.shelf, ipmb, args.upgrade_file): ipmb
+            for ipmb in args.ipmb
+        }
+
+        for future in as_completed(futures):
+            ipmb = futures[future]
+            if future.result():
+                print(f'\nDone with slot: {ipmb}')
+            else:
+                print(f'\nSkipped slot: {ipmb}')
 
 
 if __name__ == '__main__':
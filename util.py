@@ -0,0 +1,87 @@
+"""Shared helpers for talking to the IPMC telnet interface."""
+
+import socket
+
+# The port for the telnet service on the IPMC
+PORT = 23
+
+
+def _read_exactly(sock: socket.socket, buf: bytearray, count: int) -> None:
+    """
+    Consumes and discards exactly count bytes from the socket.
+
+    Any extra bytes already received stay in buf, which acts as the
+    carry-over buffer between consecutive reads on the same socket.
+    """
+    while len(buf) < count:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        buf.extend(chunk)
+
+    del buf[:count]
+
+
+def _read_until_prompt(
+    sock: socket.socket,
+    buf: bytearray,
+    max_size: int=2048,
+    read_until: bytes=b"> ",
+    ) -> str:
+    """
+    Reads from the socket until the IPMC prompt shows up and returns the
+    data before it, leaving any bytes after the prompt in buf.
+
+    The maximum message size to expect is specified via the max_size argument.
+    """
+    # Recieve the response in large chunks and scan for the prompt in
+    # memory, instead of one recv syscall per byte
+    idx = buf.find(read_until)
+    while idx < 0 and len(buf) < max_size:
+        # Resume the prompt scan where the previous one left off, backing
+        # up just enough to catch a sentinel that straddles two chunks
+        search_from = max(0, len(buf) - len(read_until) + 1)
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        buf.extend(chunk)
+        idx = buf.find(read_until, search_from)
+
+    # Everything up to the prompt is the command output
+    if idx < 0:
+        idx = min(len(buf), max_size)
+        data = buf[:idx]
+        del buf[:idx]
+    else:
+        data = buf[:idx]
+        del buf[:idx + len(read_until)]
+
+    return data.decode('ascii')
+
+
+def write_command_and_read_output(
+    sock: socket.socket,
+    command: str,
+    max_size: int=2048,
+    read_until: bytes=b"> ",
+    ) -> str:
+    """
+    Given the socket interface, writes a command to IPMC TelNet interface
+    and returns the data echoed back.
+
+    The maximum message size to expect is specified via the max_size argument.
+    """
+    # Make sure Nagle's algorithm is off for this socket: the small telnet
+    # writes below would otherwise stall waiting for the Nagle timer.
+    # Setting the option again on an already-configured socket is harmless.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    # Send the whole command in one go: a single syscall and a single
+    # TCP segment instead of one per character
+    sock.sendall(command.encode('ascii'))
+
+    # Skip the echo of the command, then read up to the prompt
+    buf = bytearray()
+    _read_exactly(sock, buf, len(command))
+
+    return _read_until_prompt(sock, buf, max_size, read_until)